@@ -1,66 +1,170 @@
 import os
-import json
+import sys
 import time
-import requests
-from concurrent.futures import ThreadPoolExecutor
-from typing import List
+import orjson
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import List, Optional, Tuple
+from slack_api import SESSION, slack_get
 
 THREADS_JSON = "threads.json"
 REPLIES_JSON = "replies.json"
+REPLIES_JSONL = "replies.jsonl"
 PROGRESS_FILE = "progress.json"
+MAX_WORKERS = 5
+MAX_IN_FLIGHT = MAX_WORKERS * 2
+CHECKPOINT_EVERY = 50
+CHECKPOINT_SECONDS = 10
+LOG_EVERY = 100
+LOG_SECONDS = 5
+TAIL_CHUNK = 64 * 1024
 
 def load_config(config_path: str = 'config.json') -> dict:
     if not os.path.exists(config_path):
         raise FileNotFoundError(
             f"{config_path} bulunamadı. Lütfen token, cookie ve channel bilgilerini içeren bir config.json oluşturun."
         )
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with open(config_path, 'rb') as f:
+        return orjson.loads(f.read())
 
-def fetch_replies_for_thread(token: str, cookie: str, channel: str, thread_ts: str, limit: int = 1000) -> List[dict]:
-    url = "https://slack.com/api/conversations.replies"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Cookie": cookie
+def project_replies(msgs, _get=dict.get) -> List[dict]:
+    # Ana mesaj atlanır, her reply yalnızca gereken alanlara indirgenir.
+    # dict.get önceden bağlanır ve ts/thread_ts birer kez okunur: sıcak döngü.
+    batch = []
+    append = batch.append
+    for m in msgs:
+        ts = m["ts"]
+        thread_ts = _get(m, "thread_ts")
+        if thread_ts and ts != thread_ts:
+            append({
+                "ts": ts,
+                "thread_ts": thread_ts,
+                "user": _get(m, "user"),
+                "text": _get(m, "text", "")
+            })
+    return batch
+
+def thread_params(channel: str, thread_ts: str, limit: int = 1000) -> dict:
+    return {
+        "channel": channel,
+        "ts": thread_ts,
+        "limit": limit
     }
-    replies = []
-    cursor = None
-
-    while True:
-        params = {
-            "channel": channel,
-            "ts": thread_ts,
-            "limit": limit
-        }
-        if cursor:
-            params["cursor"] = cursor
-
-        resp = requests.get(url, headers=headers, params=params)
-        if resp.status_code == 429:
-            retry_after = int(resp.headers.get("Retry-After", 1))
-            print(f"Rate limit ({thread_ts}). Bekleniyor {retry_after}s...")
-            time.sleep(retry_after)
-            continue
-
-        resp.raise_for_status()
-        data = resp.json()
-        if not data.get("ok"):
-            print(f"Error fetching replies for {thread_ts}: {data.get('error')}")
-            break
-
-        msgs = data.get("messages", [])
-        batch = [m for m in msgs if m.get("thread_ts") and m["ts"] != m["thread_ts"]]
-        replies.extend(batch)
-
-        cursor = data.get("response_metadata", {}).get("next_cursor")
-        if not cursor:
-            break
-
-    return replies
-
-def save_json(data, filename: str):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+
+def fetch_replies_page(params: dict, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    # params thread başına bir kez kurulur; sonraki sayfalarda yalnızca cursor eklenmiş kopyası gider.
+    if cursor:
+        params = params.copy()
+        params["cursor"] = cursor
+
+    data = slack_get("conversations.replies", params)
+    if not data.get("ok"):
+        print(f"Error fetching replies for {params['ts']}: {data.get('error')}")
+        return [], None
+
+    # Yalnızca gereken alanlar alınır; yanıtın geri kalanı hemen bırakılır.
+    msgs = data.get("messages") or ()
+    cursor = (data.get("response_metadata") or {}).get("next_cursor")
+    del data
+    return project_replies(msgs), cursor or None
+
+def save_progress(index: int, finished=(), replies_offset: Optional[int] = None,
+                  filename: str = PROGRESS_FILE):
+    # Önce geçici dosyaya yaz, sonra atomik olarak değiştir: çökme anında progress.json bozulmaz.
+    # finished: önekten sonra sırasız tamamlanan thread index'leri (en fazla MAX_IN_FLIGHT kadar).
+    # replies_offset: replies.jsonl'in yalnızca tamamlanmış thread'leri içeren bayt uzunluğu.
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(orjson.dumps({
+            "last_processed_index": index,
+            "finished": sorted(finished),
+            "replies_offset": replies_offset
+        }))
+    os.replace(tmp, filename)
+
+def load_progress(filename: str = PROGRESS_FILE) -> Tuple[int, set, Optional[int]]:
+    if not os.path.exists(filename):
+        return 0, set(), None
+    try:
+        with open(filename, "rb") as pf:
+            progress = orjson.loads(pf.read())
+    except (OSError, orjson.JSONDecodeError):
+        return 0, set(), None
+    return (
+        progress.get("last_processed_index", 0),
+        set(progress.get("finished", ())),
+        progress.get("replies_offset")
+    )
+
+def load_thread_ts(filename: str = THREADS_JSON) -> List[str]:
+    # Yalnızca tekilleştirilmiş ts listesi döner; thread nesneleri fonksiyondan çıkınca serbest kalır.
+    seen = set()
+    with open(filename, "rb") as f:
+        return [
+            ts for ts in (t.get("ts") for t in orjson.loads(f.read()))
+            if ts and not (ts in seen or seen.add(ts))
+        ]
+
+def load_done_thread_ts(filename: str = REPLIES_JSONL) -> set:
+    done = set()
+    if os.path.exists(filename):
+        with open(filename, "rb") as f:
+            for line in f:
+                if line.strip():
+                    done.add(orjson.loads(line)["thread_ts"])
+    return done
+
+def prepare_replies_jsonl(replies_offset: Optional[int] = None, filename: str = REPLIES_JSONL):
+    if os.path.exists(filename):
+        if replies_offset is not None:
+            # Son checkpoint'ten sonra yazılanlar (yarım thread'ler dahil) atılır; o thread'ler
+            # tamamlanmış sayılmadığı için yeniden çekilir.
+            with open(filename, "rb+") as f:
+                if f.seek(0, os.SEEK_END) > replies_offset:
+                    f.truncate(replies_offset)
+            return
+        # Çökme sırasında yarım kalan son satırı kes ki sonraki append'ler bozulmasın.
+        # Dosyanın tamamı okunmaz: sondan geriye doğru yalnızca son '\n' aranır.
+        with open(filename, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = end
+            while pos > 0:
+                step = min(TAIL_CHUNK, pos)
+                pos -= step
+                f.seek(pos)
+                nl = f.read(step).rfind(b"\n")
+                if nl != -1:
+                    f.truncate(pos + nl + 1)
+                    return
+            f.truncate(0)
+    elif os.path.exists(REPLIES_JSON):
+        # Eski sürümün replies.json dosyasını JSONL'e taşı ki önceki reply'ler kaybolmasın.
+        try:
+            with open(REPLIES_JSON, "rb") as rf:
+                old_replies = orjson.loads(rf.read())
+        except orjson.JSONDecodeError:
+            old_replies = []
+        with open(filename, "wb") as f:
+            for m in old_replies:
+                f.write(orjson.dumps(m))
+                f.write(b"\n")
+
+def assemble_replies_json(src: str = REPLIES_JSONL, dst: str = REPLIES_JSON):
+    # JSONL satırları zaten geçerli JSON; parse etmeden satır satır tek bir diziye birleştirilir.
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        sep = b"[\n"
+        for line in fin:
+            line = line.rstrip()
+            if line:
+                fout.write(sep)
+                fout.write(line)
+                sep = b",\n"
+        fout.write(b"[]\n" if sep == b"[\n" else b"\n]\n")
 
 def main():
     print("→ Reply-fetcher başlıyor...")
@@ -70,48 +174,115 @@ def main():
     channel = cfg.get("CHANNEL_ID")
     if not token or not channel:
         raise ValueError("SLACK_TOKEN ve CHANNEL_ID config.json içinde olmalı.")
+    SESSION.headers.update({
+        "Authorization": f"Bearer {token}",
+        "Cookie": cookie
+    })
 
     if not os.path.exists(THREADS_JSON):
         raise FileNotFoundError(f"{THREADS_JSON} bulunamadı. Önce thread export scriptini çalıştırın.")
-    with open(THREADS_JSON, "r", encoding="utf-8") as f:
-        threads = json.load(f)
-    thread_ts_list = [t["ts"] for t in threads if t.get("ts")]
+    thread_ts_list = load_thread_ts()
 
     total = len(thread_ts_list)
     print(f"Toplam işlenecek thread: {total}")
 
-    start_idx = 0
-    if os.path.exists(PROGRESS_FILE):
-        try:
-            with open(PROGRESS_FILE, "r", encoding="utf-8") as pf:
-                start_idx = json.load(pf).get("last_processed_index", 0)
-        except:
-            start_idx = 0
+    start_idx, finished, replies_offset = load_progress()
+
+    prepare_replies_jsonl(replies_offset)
+
+    # replies.jsonl son checkpoint'e göre kırpıldığı için yalnızca tamamlanmış thread'leri içerir;
+    # orada bulunan thread'ler tekrar çekilmez.
+    done_ts = load_done_thread_ts()
+    pending = []
+    for idx, ts in enumerate(thread_ts_list[start_idx:], start_idx):
+        if idx in finished or ts in done_ts:
+            finished.add(idx)
+        else:
+            pending.append((idx, ts))
+    del done_ts
+    if finished:
+        print(f"{len(finished)} thread zaten kaydedilmiş, atlanıyor.")
 
-    if os.path.exists(REPLIES_JSON):
+    # Sonuçlar tamamlandıkça işlenir; progress yalnızca kesintisiz tamamlanan önek kadar ilerler.
+    next_idx = start_idx
+    while next_idx in finished:
+        finished.remove(next_idx)
+        next_idx += 1
+    with open(REPLIES_JSONL, "ab") as out, \
+            ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+
+        def checkpoint():
+            # Önce reply'ler diske, sonra progress: progress asla yazılmamış veriyi göstermez.
+            out.flush()
+            os.fsync(out.fileno())
+            save_progress(next_idx, finished, safe_offset)
+
+        # safe_offset yalnızca bir thread'in tüm satırları yazıldıktan sonra ilerler.
+        safe_offset = out.tell()
+        checkpoint()
+
+        # Her iş tek bir sayfa: sonraki cursor havuza yeni iş olarak eklenir, böylece
+        # çok sayfalı bir thread bir worker'ı baştan sona meşgul etmez. Aynı anda en fazla
+        # MAX_IN_FLIGHT iş bekler; bellekte tutulan yarım thread sayısı da bununla sınırlı.
+        # Bir thread'in sayfaları bellekte toplanır ve thread bitince tek seferde yazılır;
+        # kesinti anında dosyaya yarım düşen bir thread resume'da safe_offset ile kırpılır.
+        todo = iter(pending)
+        futures = {}
+        partial = {}
+        completed = total - len(pending)
+        written = 0
+        unsaved = 0
+        last_checkpoint = last_log = time.monotonic()
+        log_end = "\r" if sys.stdout.isatty() else "\n"
         try:
-            with open(REPLIES_JSON, "r", encoding="utf-8") as rf:
-                replies_data = json.load(rf)
-        except:
-            replies_data = []
-    else:
-        replies_data = []
-
-    slice_ts = thread_ts_list[start_idx:]
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        for offset, replies in enumerate(executor.map(
-            lambda ts: fetch_replies_for_thread(token, cookie, channel, ts),
-            slice_ts
-        )):
-            idx = start_idx + offset
-            replies_data.extend(replies)
-
-            save_json(replies_data, REPLIES_JSON)
-            save_json({"last_processed_index": idx + 1}, PROGRESS_FILE)
-            print(f"[{idx+1}/{total}] ts={slice_ts[offset]} → {len(replies)} reply kaydedildi.")
-
-    save_json({"last_processed_index": 0}, PROGRESS_FILE)
-    print("Tüm reply’ler çekildi. progress.json sıfırlandı.")
+            while True:
+                for idx, ts in islice(todo, max(0, MAX_IN_FLIGHT - len(futures))):
+                    params = thread_params(channel, ts)
+                    futures[executor.submit(fetch_replies_page, params)] = idx, params
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    idx, params = futures.pop(fut)
+                    batch, cursor = fut.result()
+                    if cursor:
+                        partial.setdefault(idx, []).extend(batch)
+                        futures[executor.submit(fetch_replies_page, params, cursor)] = idx, params
+                        continue
+
+                    replies = partial.pop(idx, [])
+                    replies.extend(batch)
+                    if replies:
+                        out.write(b"\n".join(map(orjson.dumps, replies)) + b"\n")
+                        safe_offset = out.tell()
+                    finished.add(idx)
+                    while next_idx in finished:
+                        finished.remove(next_idx)
+                        next_idx += 1
+
+                    completed += 1
+                    written += len(replies)
+                    unsaved += 1
+                    now = time.monotonic()
+                    if unsaved >= CHECKPOINT_EVERY or now - last_checkpoint >= CHECKPOINT_SECONDS:
+                        checkpoint()
+                        unsaved = 0
+                        last_checkpoint = now
+                    if completed % LOG_EVERY == 0 or completed == total or now - last_log >= LOG_SECONDS:
+                        print(f"[{completed}/{total}] thread işlendi → {written} reply kaydedildi.", end=log_end, flush=True)
+                        last_log = now
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print("Durduruldu. Tekrar çalıştırınca kaldığı yerden devam eder.")
+            raise
+        finally:
+            checkpoint()
+            if log_end == "\r":
+                print()
+
+    assemble_replies_json()
+    os.remove(PROGRESS_FILE)
+    print("Tüm reply’ler çekildi. progress.json silindi.")
 
 if __name__ == "__main__":
     main()
@@ -1,19 +1,19 @@
 import csv
-import requests
-import time
-import json
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import orjson
+from urllib.parse import urlsplit
+from slack_api import SESSION, slack_get
 
 SINCE_TS_FILE = 'since_ts.txt'
+THREAD_URL_PREFIX = 'https://{host}/archives/{channel}/p'
 
 def load_config(config_path='config.json'):
     if not os.path.exists(config_path):
         raise FileNotFoundError(
             f"{config_path} not found. Please create a config.json containing the token, cookie, and channel information."
         )
-    with open(config_path, 'r', encoding='utf-8') as file:
-        return json.load(file)
+    with open(config_path, 'rb') as file:
+        return orjson.loads(file.read())
 
 def load_since_ts(path=SINCE_TS_FILE):
     if os.path.exists(path):
@@ -26,38 +26,25 @@ def save_since_ts(ts, path=SINCE_TS_FILE):
     with open(path, 'w', encoding='utf-8') as f:
         f.write(ts)
 
-def fetch_only_thread_messages(token, cookie, channel_id, since_ts=None):
+def fetch_only_thread_messages(channel_id, since_ts=None):
     print(f"Fetching threads since ts={since_ts}...")
-    BASE = "https://slack.com/api"
-    history_url = f"{BASE}/conversations.history"
     params = {'channel': channel_id, 'limit': 1000}
     if since_ts:
         params['oldest'] = since_ts
 
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'Cookie': cookie
-    }
-
     threads = []
     cursor = None
     while True:
         if cursor:
             params['cursor'] = cursor
-        resp = requests.get(history_url, headers=headers, params=params)
-        if resp.status_code == 429:
-            wait = int(resp.headers.get('Retry-After', 10))
-            print(f"Rate limit → sleeping {wait}s")
-            time.sleep(wait)
-            continue
-        resp.raise_for_status()
-        data = resp.json()
+        data = slack_get('conversations.history', params)
         if not data.get('ok'):
             print("Error:", data.get('error'))
             break
 
-        msgs = data.get('messages', [])
+        msgs = data.get('messages') or ()
+        cursor = (data.get('response_metadata') or {}).get('next_cursor')
+        del data
         for m in msgs:
             if m.get('reply_count', 0) > 0:
                 threads.append({
@@ -69,54 +56,32 @@ def fetch_only_thread_messages(token, cookie, channel_id, since_ts=None):
                     'subtype': m.get('subtype', 'normal_message'),
                     'thread_url': None
                 })
-        cursor = data.get('response_metadata', {}).get('next_cursor')
         if not cursor:
             break
-        time.sleep(1)
-
-    total = len(threads)
-    print(f"{total} threads found → fetching permalinks...")
-    completed = 0
-    with ThreadPoolExecutor(max_workers=10) as ex:
-        future_to_msg = {
-            ex.submit(get_permalink_for_message, token, cookie, channel_id, t['ts']): t
-            for t in threads
-        }
-        for fut in as_completed(future_to_msg):
-            msg = future_to_msg[fut]
-            try:
-                msg['thread_url'] = fut.result()
-            except Exception:
-                msg['thread_url'] = ''
-            completed += 1
-            percent = completed / total * 100
-            print(f"Permalinks: {completed}/{total} ({percent:.1f}%)", end='\r', flush=True)
-    print()
+
+    print(f"{len(threads)} threads found → building permalinks...")
+    if threads:
+        # Permalinks follow a fixed pattern, so only the workspace host needs an API call.
+        host = get_permalink_host(channel_id, threads[0]['ts'])
+        prefix = THREAD_URL_PREFIX.format(host=host, channel=channel_id) if host else None
+        for t in threads:
+            t['thread_url'] = prefix + t['ts'].replace('.', '') if prefix else ''
 
     threads.sort(key=lambda x: float(x['ts']))
     return threads
 
-def get_permalink_for_message(token, cookie, channel_id, message_ts):
-    BASE = "https://slack.com/api/chat.getPermalink"
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'Cookie': cookie
-    }
-    params = {'channel': channel_id, 'message_ts': message_ts}
-    while True:
-        resp = requests.get(BASE, headers=headers, params=params)
-        if resp.status_code == 429:
-            wait = int(resp.headers.get('Retry-After', 10))
-            time.sleep(wait)
-            continue
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get('permalink', '')
+def get_permalink_for_message(channel_id, message_ts):
+    return slack_get('chat.getPermalink', {'channel': channel_id, 'message_ts': message_ts}).get('permalink', '')
+
+def get_permalink_host(channel_id, message_ts):
+    try:
+        return urlsplit(get_permalink_for_message(channel_id, message_ts)).netloc
+    except Exception:
+        return ''
 
 def save_threads_to_json(threads, filename='threads.json'):
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(threads, f, ensure_ascii=False, indent=4)
+    with open(filename, 'wb') as f:
+        f.write(orjson.dumps(threads, option=orjson.OPT_INDENT_2))
     print(f"Saved {len(threads)} threads to {filename}")
 
 def main():
@@ -126,9 +91,14 @@ def main():
     channel = cfg.get('CHANNEL_ID')
     if not token or not channel:
         raise ValueError("SLACK_TOKEN and CHANNEL_ID must be in config.json")
+    SESSION.headers.update({
+        'Authorization': f'Bearer {token}',
+        'Content-Type': 'application/json',
+        'Cookie': cookie
+    })
 
     last_ts = load_since_ts()
-    threads = fetch_only_thread_messages(token, cookie, channel, since_ts=last_ts)
+    threads = fetch_only_thread_messages(channel, since_ts=last_ts)
     if not threads:
         print("Yeni thread bulunamadı.")
         return
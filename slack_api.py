@@ -0,0 +1,121 @@
+import threading
+import time
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://slack.com/api"
+REQUEST_TIMEOUT = 30
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+
+# Requests per minute for each Slack rate-limit tier we call.
+TIER_LIMITS = {
+    "conversations.history": 50,
+    "conversations.replies": 50,
+    "chat.getPermalink": 100,
+}
+DEFAULT_LIMIT = 50
+
+# One shared Session so TCP+TLS connections to slack.com are reused across calls.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0))
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` calls per `per` seconds."""
+
+    def __init__(self, rate, per=60):
+        self.capacity = rate
+        self.fill_rate = rate / per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Empty the bucket and hold back every caller for `seconds`."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.fill_rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter_for(method):
+    with _limiters_lock:
+        if method not in _limiters:
+            _limiters[method] = RateLimiter(TIER_LIMITS.get(method, DEFAULT_LIMIT))
+        return _limiters[method]
+
+
+def _backoff(attempt, retry_after=0):
+    return max(retry_after, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def slack_get(method, params):
+    """GET a Slack Web API method and return the decoded JSON body.
+
+    Calls are paced by the method's token bucket. Rate-limit responses (HTTP
+    429 or `error == "ratelimited"`) pause the whole bucket for Retry-After
+    or an exponential backoff and are retried indefinitely. 5xx responses
+    and network errors are retried with exponential backoff up to
+    MAX_ATTEMPTS times.
+    """
+    limiter = _limiter_for(method)
+    url = f"{BASE_URL}/{method}"
+    failures = 0
+    throttled = 0
+    while True:
+        limiter.acquire()
+        try:
+            resp = SESSION.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            failures += 1
+            if failures >= MAX_ATTEMPTS:
+                raise
+            wait = _backoff(failures - 1)
+            print(f"{method}: network error ({e}) → retrying in {wait}s")
+            time.sleep(wait)
+            continue
+
+        if resp.status_code == 429:
+            data = None
+        elif resp.status_code >= 500:
+            failures += 1
+            if failures >= MAX_ATTEMPTS:
+                resp.raise_for_status()
+            wait = _backoff(failures - 1)
+            print(f"{method}: HTTP {resp.status_code} → retrying in {wait}s")
+            time.sleep(wait)
+            continue
+        else:
+            resp.raise_for_status()
+            data = orjson.loads(resp.content)
+            if data.get("error") != "ratelimited":
+                return data
+
+        # Rate limit: every worker sharing this method's bucket waits, not only this one.
+        wait = _backoff(throttled, int(resp.headers.get("Retry-After", 0)))
+        throttled += 1
+        print(f"{method}: rate limited → pausing all requests for {wait}s")
+        limiter.pause(wait)